@@ -38,6 +38,19 @@ TIMEZONE_DATABASE = {
     "los angeles": "America/Los_Angeles",
 }
 
+# ZoneInfo objects built once at import instead of on every time lookup
+TIMEZONE_OBJECTS = {city: ZoneInfo(tz) for city, tz in TIMEZONE_DATABASE.items()}
+
+# Invariant part of each weather report, formatted once at import
+WEATHER_REPORT_SUFFIX = {
+    city: (
+        f"is {weather['condition']} with a temperature of "
+        f"{weather['temperature_celsius']} degrees Celsius "
+        f"({weather['temperature_fahrenheit']} degrees Fahrenheit)."
+    )
+    for city, weather in WEATHER_DATABASE.items()
+}
+
 def get_weather(city: str) -> dict:
     """Retrieves the current weather report for a specified city.
 
@@ -47,16 +60,11 @@ def get_weather(city: str) -> dict:
     Returns:
         dict: status and result or error msg.
     """
-    city_key = city.lower()
-    if city_key in WEATHER_DATABASE:
-        weather = WEATHER_DATABASE[city_key]
+    report_suffix = WEATHER_REPORT_SUFFIX.get(city.lower())
+    if report_suffix:
         return {
             "status": "success",
-            "report": (
-                f"The weather in {city} is {weather['condition']} with a temperature of "
-                f"{weather['temperature_celsius']} degrees Celsius "
-                f"({weather['temperature_fahrenheit']} degrees Fahrenheit)."
-            ),
+            "report": f"The weather in {city} {report_suffix}",
         }
     else:
         return {
@@ -74,10 +82,8 @@ def get_current_time(city: str) -> dict:
     Returns:
         dict: status and result or error msg.
     """
-    city_key = city.lower()
-    if city_key in TIMEZONE_DATABASE:
-        tz_identifier = TIMEZONE_DATABASE[city_key]
-    else:
+    tz = TIMEZONE_OBJECTS.get(city.lower())
+    if tz is None:
         return {
             "status": "error",
             "error_message": (
@@ -85,7 +91,6 @@ def get_current_time(city: str) -> dict:
             ),
         }
 
-    tz = ZoneInfo(tz_identifier)
     now = datetime.datetime.now(tz)
     report = (
         f'The current time in {city} is {now.strftime("%Y-%m-%d %H:%M:%S %Z%z")}'
@@ -1,44 +1,8 @@
-import datetime
-from zoneinfo import ZoneInfo
 from google.adk.agents import Agent
 from google.adk.models.lite_llm import LiteLlm
 import os
 
-# Database of cities and their weather information
-WEATHER_DATABASE = {
-    "new york": {
-        "condition": "sunny",
-        "temperature_celsius": 25,
-        "temperature_fahrenheit": 77,
-    },
-    "london": {
-        "condition": "rainy", 
-        "temperature_celsius": 18,
-        "temperature_fahrenheit": 64,
-    },
-    "tokyo": {
-        "condition": "cloudy",
-        "temperature_celsius": 22,
-        "temperature_fahrenheit": 72,
-    },
-    "sydney": {
-        "condition": "partly cloudy",
-        "temperature_celsius": 27,
-        "temperature_fahrenheit": 81,
-    },
-}
-
-# Database of cities and their timezone identifiers
-TIMEZONE_DATABASE = {
-    "new york": "America/New_York",
-    "london": "Europe/London",
-    "tokyo": "Asia/Tokyo",
-    "sydney": "Australia/Sydney",
-    "paris": "Europe/Paris",
-    "berlin": "Europe/Berlin",
-    "mumbai": "Asia/Kolkata",
-    "los angeles": "America/Los_Angeles",
-}
+from city_data import CITY_INFO, formatted_now
 
 def get_weather(city: str) -> dict:
     """Retrieves the current weather report for a specified city.
@@ -49,16 +13,11 @@ def get_weather(city: str) -> dict:
     Returns:
         dict: status and result or error msg.
     """
-    city_key = city.lower()
-    if city_key in WEATHER_DATABASE:
-        weather = WEATHER_DATABASE[city_key]
+    entry = CITY_INFO.get(city.lower())
+    if entry and entry["report_suffix"]:
         return {
             "status": "success",
-            "report": (
-                f"The weather in {city} is {weather['condition']} with a temperature of "
-                f"{weather['temperature_celsius']} degrees Celsius "
-                f"({weather['temperature_fahrenheit']} degrees Fahrenheit)."
-            ),
+            "report": f"The weather in {city} {entry['report_suffix']}",
         }
     else:
         return {
@@ -76,9 +35,9 @@ def get_current_time(city: str) -> dict:
     Returns:
         dict: status and result or error msg.
     """
-    city_key = city.lower()
-    if city_key in TIMEZONE_DATABASE:
-        tz_identifier = TIMEZONE_DATABASE[city_key]
+    entry = CITY_INFO.get(city.lower())
+    if entry and entry["tz"]:
+        tz = entry["tz"]
     else:
         return {
             "status": "error",
@@ -87,24 +46,23 @@ def get_current_time(city: str) -> dict:
             ),
         }
 
-    tz = ZoneInfo(tz_identifier)
-    now = datetime.datetime.now(tz)
-    report = (
-        f'The current time in {city} is {now.strftime("%Y-%m-%d %H:%M:%S %Z%z")}'
-    )
+    report = f"The current time in {city} is {formatted_now(tz)}"
     return {"status": "success", "report": report}
 
 
+# Read the model configuration from a single environment mapping
+env = os.environ
+
 # Determine which model to use based on environment variable
-use_azure = os.getenv("USE_AZURE_OPENAI", "false").lower() == "true"
+use_azure = env.get("USE_AZURE_OPENAI", "false").lower() == "true"
 
 if use_azure:
     # Configure Azure OpenAI model with LiteLLM
     model = LiteLlm(
-        model=f"azure/{os.getenv('DEPLOYMENT_NAME')}", # gpt-4o
-        api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-        api_base=os.getenv("ENDPOINT_URL"),
-        api_version=os.getenv("API_VERSION")
+        model=f"azure/{env.get('DEPLOYMENT_NAME')}", # gpt-4o
+        api_key=env.get("AZURE_OPENAI_API_KEY"),
+        api_base=env.get("ENDPOINT_URL"),
+        api_version=env.get("API_VERSION")
     )
     print("Using Azure OpenAI model")
 else:
@@ -1,66 +1,12 @@
-import datetime
-from zoneinfo import ZoneInfo
 from google.adk.agents import Agent
 from google.adk.agents import SequentialAgent, ParallelAgent
 
-# Database of cities and their weather information
-WEATHER_DATABASE = {
-    "new york": {
-        "condition": "sunny",
-        "temperature_celsius": 25,
-        "temperature_fahrenheit": 77,
-    },
-    "london": {
-        "condition": "rainy", 
-        "temperature_celsius": 18,
-        "temperature_fahrenheit": 64,
-    },
-    "tokyo": {
-        "condition": "cloudy",
-        "temperature_celsius": 22,
-        "temperature_fahrenheit": 72,
-    },
-    "sydney": {
-        "condition": "partly cloudy",
-        "temperature_celsius": 27,
-        "temperature_fahrenheit": 81,
-    },
-}
-
-# Database of cities and their timezone identifiers
-TIMEZONE_DATABASE = {
-    "new york": "America/New_York",
-    "london": "Europe/London",
-    "tokyo": "Asia/Tokyo",
-    "sydney": "Australia/Sydney",
-    "paris": "Europe/Paris",
-    "berlin": "Europe/Berlin",
-    "mumbai": "Asia/Kolkata",
-    "los angeles": "America/Los_Angeles",
-}
-
-# Database for city name corrections (shorthands, misspellings, etc.)
-CITY_CORRECTIONS = {
-    # Common shorthands
-    "nyc": "new york",
-    "ny": "new york",
-    "la": "los angeles",
-    "sf": "san francisco",
-    "tokyo": "tokyo",
-    
-    # Common misspellings
-    "sidney": "sydney",
-    "sydny": "sydney",
-    "londan": "london",
-    "londun": "london",
-    "tokio": "tokyo",
-    "new yrok": "new york",
-    "new yok": "new york",
-    "paaris": "paris",
-    "pari": "paris",
-    "berln": "berlin",
-    "barlin": "berlin",
-}
+from city_data import (
+    CITY_INFO,
+    canonical_city_name,
+    formatted_now,
+    validate_city,
+)
 
 def validate_city_name(city: str) -> dict:
     """Validates and corrects city names, handling shorthands and misspellings.
@@ -71,35 +17,19 @@ def validate_city_name(city: str) -> dict:
     Returns:
         dict: Status and the corrected city name or error message.
     """
-    if not city or not isinstance(city, str):
+    try:
+        # Only a string has strip(), so valid names skip an isinstance check
+        is_blank = not city.strip()
+    except AttributeError:
+        is_blank = True
+    if is_blank:
         return {
             "status": "error",
             "error_message": "Please provide a valid city name."
         }
     
-    city_lower = city.lower().strip()
-    
-    # Check if the city is already valid
-    if city_lower in WEATHER_DATABASE or city_lower in TIMEZONE_DATABASE:
-        return {
-            "status": "success",
-            "corrected_city": city
-        }
-    
-    # Check if we have a correction for this city
-    if city_lower in CITY_CORRECTIONS:
-        corrected = CITY_CORRECTIONS[city_lower]
-        return {
-            "status": "success",
-            "corrected_city": corrected,
-            "original_city": city
-        }
-    
-    # No correction found
-    return {
-        "status": "error",
-        "error_message": f"I couldn't recognize '{city}'. Please provide a valid city name."
-    }
+    # Copy the cached result so callers can't mutate the shared entry
+    return dict(validate_city(city))
 
 def get_weather(city: str) -> dict:
     """Retrieves the current weather report for a specified city.
@@ -110,16 +40,11 @@ def get_weather(city: str) -> dict:
     Returns:
         dict: status and result or error msg.
     """
-    city_key = city.lower()
-    if city_key in WEATHER_DATABASE:
-        weather = WEATHER_DATABASE[city_key]
+    entry = CITY_INFO.get(canonical_city_name(city))
+    if entry and entry["report_suffix"]:
         return {
             "status": "success",
-            "report": (
-                f"The weather in {city} is {weather['condition']} with a temperature of "
-                f"{weather['temperature_celsius']} degrees Celsius "
-                f"({weather['temperature_fahrenheit']} degrees Fahrenheit)."
-            ),
+            "report": f"The weather in {city} {entry['report_suffix']}",
         }
     else:
         return {
@@ -137,9 +62,9 @@ def get_current_time(city: str) -> dict:
     Returns:
         dict: status and result or error msg.
     """
-    city_key = city.lower()
-    if city_key in TIMEZONE_DATABASE:
-        tz_identifier = TIMEZONE_DATABASE[city_key]
+    entry = CITY_INFO.get(canonical_city_name(city))
+    if entry and entry["tz"]:
+        tz = entry["tz"]
     else:
         return {
             "status": "error",
@@ -148,11 +73,7 @@ def get_current_time(city: str) -> dict:
             ),
         }
 
-    tz = ZoneInfo(tz_identifier)
-    now = datetime.datetime.now(tz)
-    report = (
-        f'The current time in {city} is {now.strftime("%Y-%m-%d %H:%M:%S %Z%z")}'
-    )
+    report = f"The current time in {city} is {formatted_now(tz)}"
     return {"status": "success", "report": report}
 
 
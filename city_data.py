@@ -0,0 +1,247 @@
+import datetime
+import functools
+import sys
+import time
+import unicodedata
+from types import MappingProxyType
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+# Database of cities and their weather information
+WEATHER_DATABASE = {
+    "new york": {
+        "condition": "sunny",
+        "temperature_celsius": 25,
+        "temperature_fahrenheit": 77,
+    },
+    "london": {
+        "condition": "rainy",
+        "temperature_celsius": 18,
+        "temperature_fahrenheit": 64,
+    },
+    "tokyo": {
+        "condition": "cloudy",
+        "temperature_celsius": 22,
+        "temperature_fahrenheit": 72,
+    },
+    "sydney": {
+        "condition": "partly cloudy",
+        "temperature_celsius": 27,
+        "temperature_fahrenheit": 81,
+    },
+}
+
+# Database of cities and their timezone identifiers
+TIMEZONE_DATABASE = {
+    "new york": "America/New_York",
+    "london": "Europe/London",
+    "tokyo": "Asia/Tokyo",
+    "sydney": "Australia/Sydney",
+    "paris": "Europe/Paris",
+    "berlin": "Europe/Berlin",
+    "mumbai": "Asia/Kolkata",
+    "los angeles": "America/Los_Angeles",
+}
+
+# Database for city name corrections (shorthands, misspellings, etc.)
+CITY_CORRECTIONS = {
+    # Common shorthands
+    "nyc": "new york",
+    "ny": "new york",
+    "la": "los angeles",
+    "sf": "san francisco",
+    "tokyo": "tokyo",
+
+    # Common misspellings
+    "sidney": "sydney",
+    "sydny": "sydney",
+    "londan": "london",
+    "londun": "london",
+    "tokio": "tokyo",
+    "new yrok": "new york",
+    "new yok": "new york",
+    "paaris": "paris",
+    "pari": "paris",
+    "berln": "berlin",
+    "barlin": "berlin",
+}
+
+# Intern the city-name keys so equal lookups can match on identity before comparing characters,
+# and freeze the tables since they are shared by every agent and never change after import
+WEATHER_DATABASE = MappingProxyType({
+    sys.intern(city): MappingProxyType(weather) for city, weather in WEATHER_DATABASE.items()
+})
+TIMEZONE_DATABASE = MappingProxyType({sys.intern(city): tz for city, tz in TIMEZONE_DATABASE.items()})
+CITY_CORRECTIONS = MappingProxyType({
+    sys.intern(alias): sys.intern(city) for alias, city in CITY_CORRECTIONS.items()
+})
+
+# ZoneInfo objects built once at import instead of on every time lookup
+TIMEZONE_OBJECTS = MappingProxyType({city: ZoneInfo(tz) for city, tz in TIMEZONE_DATABASE.items()})
+
+# Invariant part of each weather report, formatted once at import
+WEATHER_REPORT_SUFFIX = MappingProxyType({
+    city: (
+        f"is {weather['condition']} with a temperature of "
+        f"{weather['temperature_celsius']} degrees Celsius "
+        f"({weather['temperature_fahrenheit']} degrees Fahrenheit)."
+    )
+    for city, weather in WEATHER_DATABASE.items()
+})
+
+# Single-unit variants of the report suffix for the preference-aware weather tools
+WEATHER_REPORT_SUFFIX_CELSIUS = MappingProxyType({
+    city: f"is {weather['condition']} with a temperature of {weather['temperature_celsius']} degrees Celsius."
+    for city, weather in WEATHER_DATABASE.items()
+})
+WEATHER_REPORT_SUFFIX_FAHRENHEIT = MappingProxyType({
+    city: f"is {weather['condition']} with a temperature of {weather['temperature_fahrenheit']} degrees Fahrenheit."
+    for city, weather in WEATHER_DATABASE.items()
+})
+
+# Unified per-city record so each tool call needs a single dictionary lookup
+CITY_INFO = MappingProxyType({
+    city: MappingProxyType({
+        "weather": WEATHER_DATABASE.get(city),
+        "tz": TIMEZONE_OBJECTS.get(city),
+        "report_suffix": WEATHER_REPORT_SUFFIX.get(city),
+    })
+    for city in {**WEATHER_DATABASE, **TIMEZONE_DATABASE}
+})
+
+# Maps every canonical name, shorthand and known misspelling to its canonical name
+CITY_ALIASES = MappingProxyType({city: city for city in CITY_INFO} | CITY_CORRECTIONS)
+
+# Every ASCII byte that isn't a letter or digit, deleted from ASCII names in one translate pass
+_ASCII_NON_ALNUM = bytes(i for i in range(128) if not chr(i).isalnum())
+
+def normalize_city_name(name: str) -> str:
+    """Normalizes a city name for lookup: case-folded, accents stripped, letters and digits only."""
+    # ASCII input has nothing to decompose, so a single translate pass gives the same result;
+    # bytes.translate is used because str.translate goes through a per-character mapping lookup
+    if name.isascii():
+        return name.lower().encode().translate(None, _ASCII_NON_ALNUM).decode()
+    return "".join(c for c in unicodedata.normalize("NFKD", name.casefold()) if c.isalnum())
+
+# Alias lookup keyed by normalized name, so "New-York" or "Sydney " hit without fuzzy matching
+CITY_LNRM = MappingProxyType({
+    sys.intern(normalize_city_name(alias)): canonical for alias, canonical in CITY_ALIASES.items()
+})
+
+def canonical_city_name(name: str) -> Optional[str]:
+    """Returns the canonical name for a city, shorthand or known misspelling, if any."""
+    return CITY_LNRM.get(normalize_city_name(name))
+
+# Maximum number of edits tolerated when fuzzy-matching an unknown city name
+MAX_EDIT_DISTANCE = 2
+
+def _deletes(word: str, max_distance: int) -> set:
+    """Returns every string reachable from word by removing up to max_distance characters."""
+    variants = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        variants |= frontier
+    return variants
+
+def _edit_distance(a: str, b: str) -> int:
+    """Returns the Levenshtein distance between two short strings."""
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            ))
+        previous = current
+    return previous[-1]
+
+def _build_fuzzy_index(names) -> MappingProxyType:
+    """Maps every deletion variant of each name back to the names it came from."""
+    index = {}
+    for name in names:
+        for variant in _deletes(name, MAX_EDIT_DISTANCE):
+            index.setdefault(variant, set()).add(name)
+    return MappingProxyType({variant: frozenset(names) for variant, names in index.items()})
+
+# Symmetric-delete index (the SymSpell technique) over every normalized name, shorthand and
+# known misspelling, so a typo is matched by probing a few deletion variants instead of scanning
+# every city, and a typo of a listed misspelling ("sidny" for "sidney") still resolves
+CITY_FUZZY_INDEX = _build_fuzzy_index(CITY_LNRM)
+
+# Inputs longer than this are more than MAX_EDIT_DISTANCE edits from every indexed name,
+# so they are rejected before any deletion variants are generated
+_MAX_FUZZY_LENGTH = max(map(len, CITY_FUZZY_INDEX)) + MAX_EDIT_DISTANCE
+
+def fuzzy_match_city(city_key: str) -> Optional[str]:
+    """Returns the canonical city closest to a normalized name within the allowed edit distance, if any."""
+    if len(city_key) > _MAX_FUZZY_LENGTH:
+        return None
+    # Short inputs get a smaller budget so that two-letter noise doesn't match everything
+    max_distance = min(MAX_EDIT_DISTANCE, len(city_key) // 3)
+    candidates = set()
+    for variant in _deletes(city_key, max_distance):
+        candidates |= CITY_FUZZY_INDEX.get(variant, frozenset())
+
+    best_match, best_distance = None, max_distance + 1
+    for candidate in sorted(candidates):
+        distance = _edit_distance(city_key, candidate)
+        if distance < best_distance:
+            best_match, best_distance = candidate, distance
+    return CITY_LNRM.get(best_match)
+
+@functools.lru_cache(maxsize=512)
+def validate_city(city: str) -> MappingProxyType:
+    """Cached core of the examples' validate_city_name tools; the result is read-only because it is shared."""
+    city_key = normalize_city_name(city)
+    canonical = CITY_LNRM.get(city_key)
+
+    # Fall back to fuzzy matching for typos that CITY_CORRECTIONS doesn't list
+    if canonical is None:
+        canonical = fuzzy_match_city(city_key)
+
+    # No correction found
+    if canonical is None:
+        return MappingProxyType({
+            "status": "error",
+            "error_message": f"I couldn't recognize '{city}'. Please provide a valid city name."
+        })
+
+    result = {
+        "status": "success",
+        "corrected_city": canonical
+    }
+    # Report the original spelling when a shorthand or misspelling was corrected
+    if canonical != city.lower().strip():
+        result["original_city"] = city
+    return MappingProxyType(result)
+
+# Formatted local times keyed by (timezone, epoch second), so repeated queries
+# within the same second skip datetime construction and strftime
+_time_cache = {}
+
+# " %Z%z" suffix per (timezone, UTC offset); the abbreviation only changes with the offset,
+# so this stays correct across DST transitions
+_tz_suffix_cache = {}
+
+def formatted_now(tz: ZoneInfo) -> str:
+    """Returns the current time in tz formatted for reports, reusing results within the same second."""
+    second = int(time.time())
+    key = (tz, second)
+    formatted = _time_cache.get(key)
+    if formatted is None:
+        # Entries from past seconds are never read again; drop them once the cache grows
+        if len(_time_cache) > 256:
+            _time_cache.clear()
+        now = datetime.datetime.fromtimestamp(second, tz)
+        suffix_key = (tz, now.utcoffset())
+        suffix = _tz_suffix_cache.get(suffix_key)
+        if suffix is None:
+            suffix = _tz_suffix_cache[suffix_key] = now.strftime(" %Z%z")
+        # isoformat skips strftime's format-string parsing; its first 19 characters are
+        # "YYYY-MM-DD HH:MM:SS" (the timestamp is whole seconds, so no fraction follows)
+        formatted = now.isoformat(" ")[:19] + suffix
+        _time_cache[key] = formatted
+    return formatted
@@ -1,182 +1,70 @@
-import datetime
-from zoneinfo import ZoneInfo
-from typing import Optional
 from google.adk.agents import Agent
-from google.adk.agents import SequentialAgent, ParallelAgent
-
-# Database of cities and their weather information
-WEATHER_DATABASE = {
-    "new york": {
-        "condition": "sunny",
-        "temperature_celsius": 25,
-        "temperature_fahrenheit": 77,
-    },
-    "london": {
-        "condition": "rainy", 
-        "temperature_celsius": 18,
-        "temperature_fahrenheit": 64,
-    },
-    "tokyo": {
-        "condition": "cloudy",
-        "temperature_celsius": 22,
-        "temperature_fahrenheit": 72,
-    },
-    "sydney": {
-        "condition": "partly cloudy",
-        "temperature_celsius": 27,
-        "temperature_fahrenheit": 81,
-    },
-}
-
-# Database of cities and their timezone identifiers
-TIMEZONE_DATABASE = {
-    "new york": "America/New_York",
-    "london": "Europe/London",
-    "tokyo": "Asia/Tokyo",
-    "sydney": "Australia/Sydney",
-    "paris": "Europe/Paris",
-    "berlin": "Europe/Berlin",
-    "mumbai": "Asia/Kolkata",
-    "los angeles": "America/Los_Angeles",
-}
-
-# Database for city name corrections (shorthands, misspellings, etc.)
-CITY_CORRECTIONS = {
-    # Common shorthands
-    "nyc": "new york",
-    "ny": "new york",
-    "la": "los angeles",
-    "sf": "san francisco",
-    "tokyo": "tokyo",
-    
-    # Common misspellings
-    "sidney": "sydney",
-    "sydny": "sydney",
-    "londan": "london",
-    "londun": "london",
-    "tokio": "tokyo",
-    "new yrok": "new york",
-    "new yok": "new york",
-    "paaris": "paris",
-    "pari": "paris",
-    "berln": "berlin",
-    "barlin": "berlin",
-}
+from google.adk.agents import SequentialAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.tools import ToolContext
+
+from city_data import (
+    CITY_INFO,
+    canonical_city_name,
+    formatted_now,
+    validate_city,
+)
 
-def validate_city_name(city: str) -> dict:
+def validate_city_name(city: str, tool_context: ToolContext) -> dict:
     """Validates and corrects city names, handling shorthands and misspellings.
     
     Args:
         city (str): The user-provided city name that may contain errors.
+        tool_context (ToolContext): Context containing the state.
         
     Returns:
         dict: Status and the corrected city name or error message.
     """
-    if not city or not isinstance(city, str):
-        return {
+    try:
+        # Only a string has strip(), so valid names skip an isinstance check
+        is_blank = not city.strip()
+    except AttributeError:
+        is_blank = True
+    if is_blank:
+        result = {
             "status": "error",
             "error_message": "Please provide a valid city name."
         }
+    else:
+        # Copy the cached result so callers can't mutate the shared entry
+        result = dict(validate_city(city))
     
-    city_lower = city.lower().strip()
-    
-    # Check if the city is already valid
-    if city_lower in WEATHER_DATABASE or city_lower in TIMEZONE_DATABASE:
-        return {
-            "status": "success",
-            "corrected_city": city
-        }
-    
-    # Check if we have a correction for this city
-    if city_lower in CITY_CORRECTIONS:
-        corrected = CITY_CORRECTIONS[city_lower]
-        return {
-            "status": "success",
-            "corrected_city": corrected,
-            "original_city": city
-        }
-    
-    # No correction found
-    return {
-        "status": "error",
-        "error_message": f"I couldn't recognize '{city}'. Please provide a valid city name."
-    }
+    # Keep the validated city in state for the combination agent's instruction,
+    # clearing any city left over from an earlier turn when validation fails
+    tool_context.state["corrected_city"] = result.get("corrected_city", "")
+    return result
 
-def get_weather(city: str) -> dict:
-    """Retrieves the current weather report for a specified city.
+def get_weather_and_time(city: str) -> dict:
+    """Retrieves the current weather report and local time for a specified city in one call.
 
     Args:
-        city (str): The name of the city for which to retrieve the weather report.
+        city (str): The name of the city for which to retrieve the weather and time.
 
     Returns:
-        dict: status and result or error msg.
+        dict: status and both reports, or error msg.
     """
-    city_key = city.lower()
-    if city_key in WEATHER_DATABASE:
-        weather = WEATHER_DATABASE[city_key]
-        return {
-            "status": "success",
-            "report": (
-                f"The weather in {city} is {weather['condition']} with a temperature of "
-                f"{weather['temperature_celsius']} degrees Celsius "
-                f"({weather['temperature_fahrenheit']} degrees Fahrenheit)."
-            ),
-        }
-    else:
+    entry = CITY_INFO.get(canonical_city_name(city))
+    if not entry:
         return {
             "status": "error",
-            "error_message": f"Weather information for '{city}' is not available.",
+            "error_message": f"Weather and time information for '{city}' is not available.",
         }
 
-
-def get_current_time(city: str) -> dict:
-    """Returns the current time in a specified city.
-
-    Args:
-        city (str): The name of the city for which to retrieve the current time.
-
-    Returns:
-        dict: status and result or error msg.
-    """
-    city_key = city.lower()
-    if city_key in TIMEZONE_DATABASE:
-        tz_identifier = TIMEZONE_DATABASE[city_key]
+    # A city may have a timezone but no weather data (or the reverse), so report each part separately
+    if entry["report_suffix"]:
+        weather = f"The weather in {city} {entry['report_suffix']}"
     else:
-        return {
-            "status": "error",
-            "error_message": (
-                f"Sorry, I don't have timezone information for {city}."
-            ),
-        }
-
-    tz = ZoneInfo(tz_identifier)
-    now = datetime.datetime.now(tz)
-    report = (
-        f'The current time in {city} is {now.strftime("%Y-%m-%d %H:%M:%S %Z%z")}'
-    )
-    return {"status": "success", "report": report}
-
-def combine_weather_time_info(city: Optional[str] = None) -> dict:
-    """Combines weather and time information into a single response.
-    
-    Args:
-        city (Optional[str], optional): The city name. Defaults to None.
-        
-    Returns:
-        dict: Combined weather and time information or error message.
-    """
-    if not city:
-        return {
-            "status": "error",
-            "error_message": "No city information was provided."
-        }
-    
-    # Format the output in a user-friendly way
-    return {
-        "status": "success",
-        "message": f"Here's the information for {city}:",
-        "city": city
-    }
+        weather = f"Weather information for '{city}' is not available."
+    if entry["tz"]:
+        current_time = f"The current time in {city} is {formatted_now(entry['tz'])}"
+    else:
+        current_time = f"Sorry, I don't have timezone information for {city}."
+    return {"status": "success", "weather": weather, "time": current_time}
 
 model = "gemini-2.0-flash-exp"  # or another Gemini model version
 
@@ -192,56 +80,48 @@ validation_agent = Agent(
     tools=[validate_city_name],
 )
 
-# Create separate weather agent
-weather_agent = Agent(
-    name="weather_agent",
+# Create the weather and time agent; one fused tool call replaces the former
+# parallel weather and time agents, saving a model round-trip per query
+weather_time_agent = Agent(
+    name="weather_time_agent",
     model=model,
-    description="Agent to answer questions about the weather in a city",
+    description="Agent to answer questions about the weather and current time in a city",
     instruction=(
-        "You are a helpful agent who can provide weather information for a city."
+        "You are a helpful agent who can provide weather and current time information for a city."
     ),
-    tools=[get_weather],
+    tools=[get_weather_and_time],
+    output_key="weather_time_report",
 )
 
-# Create separate time agent
-time_agent = Agent(
-    name="time_agent",
-    model=model,
-    description="Agent to answer questions about the current time in a city",
-    instruction=(
-        "You are a helpful agent who can provide current time information for a city."
-    ),
-    tools=[get_current_time],
-)
-
-# Create a combination agent
+# Create a combination agent; the validated city and the weather and time report are
+# filled into its instruction from state, so it answers without calling a tool
 combination_agent = Agent(
     name="combination_agent",
     model=model,
     description="Agent that combines weather and time information",
     instruction=(
         "You are a helpful agent who combines weather and time information for a city "
-        "into a comprehensive response."
+        "into a comprehensive response.\n"
+        "City: {corrected_city?}\n"
+        "Weather and time information: {weather_time_report?}"
     ),
-    tools=[combine_weather_time_info],
 )
 
-# Create the parallel agent that gets weather and time information simultaneously
-parallel_weather_time_agent = ParallelAgent(
-    name="parallel_weather_time_agent",
-    description="Gets weather and time information in parallel",
-    sub_agents=[weather_agent, time_agent],
-)
+def start_pipeline_turn(callback_context: CallbackContext):
+    """Clears the previous turn's validated city, in case validation answers without its tool."""
+    if callback_context.state.get("corrected_city"):
+        callback_context.state["corrected_city"] = ""
 
 # Create the sequential agent pipeline:
 # 1. First validates the city name
-# 2. Then runs weather and time agents in parallel
+# 2. Then looks up weather and time together with a single tool call
 # 3. Finally combines the results
 root_agent = SequentialAgent(
     name="enhanced_parallel_weather_time_agent",
     description=(
         "Enhanced agent that validates city names before answering questions about "
-        "weather and time in parallel for the corrected city, then combines the results."
+        "weather and time for the corrected city, then combines the results."
     ),
-    sub_agents=[validation_agent, parallel_weather_time_agent, combination_agent],
+    sub_agents=[validation_agent, weather_time_agent, combination_agent],
+    before_agent_callback=start_pipeline_turn,
 ) 
\ No newline at end of file
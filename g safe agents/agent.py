@@ -1,73 +1,29 @@
 import datetime
+import functools
 import re
-from zoneinfo import ZoneInfo
-from typing import Any, Dict, Optional, List
+from typing import Any, AsyncGenerator, Dict
 
 from google.adk import Agent
-from google.adk.agents import SequentialAgent, ParallelAgent
+from google.adk.agents import BaseAgent, SequentialAgent
 from google.adk.agents.invocation_context import InvocationContext
 from google.adk.agents.callback_context import CallbackContext
-from google.adk.models import LlmRequest
+from google.adk.events import Event
+from google.adk.models import Gemini, LlmRequest
 from google.adk.tools import BaseTool, ToolContext
+from google.genai.types import Part, Content
 
-# Weather database
-WEATHER_DATABASE = {
-    "new york": {
-        "condition": "sunny",
-        "temperature_celsius": 25,
-        "temperature_fahrenheit": 77,
-    },
-    "london": {
-        "condition": "rainy", 
-        "temperature_celsius": 18,
-        "temperature_fahrenheit": 64,
-    },
-    "tokyo": {
-        "condition": "cloudy",
-        "temperature_celsius": 22,
-        "temperature_fahrenheit": 72,
-    },
-    "sydney": {
-        "condition": "partly cloudy",
-        "temperature_celsius": 27,
-        "temperature_fahrenheit": 81,
-    },
-}
-
-# Timezone database
-TIMEZONE_DATABASE = {
-    "new york": "America/New_York",
-    "london": "Europe/London",
-    "tokyo": "Asia/Tokyo",
-    "sydney": "Australia/Sydney",
-    "paris": "Europe/Paris",
-    "berlin": "Europe/Berlin",
-    "mumbai": "Asia/Kolkata",
-    "los angeles": "America/Los_Angeles",
-}
-
-# City corrections database
-CITY_CORRECTIONS = {
-    # Common shorthands
-    "nyc": "new york",
-    "ny": "new york",
-    "la": "los angeles",
-    "sf": "san francisco",
-    "tokyo": "tokyo",
-    
-    # Common misspellings
-    "sidney": "sydney",
-    "sydny": "sydney",
-    "londan": "london",
-    "londun": "london",
-    "tokio": "tokyo",
-    "new yrok": "new york",
-    "new yok": "new york",
-    "paaris": "paris",
-    "pari": "paris",
-    "berln": "berlin",
-    "barlin": "berlin",
-}
+from stateful_tools import (
+    before_agent as init_stateful_defaults,
+    combine_weather_time_info,
+    get_current_time,
+    get_recent_cities,
+    get_weather,
+    get_weather_and_time,
+    set_state_if_changed,
+    tool_def,
+    update_temperature_preference,
+    validate_city_name,
+)
 
 # Define blocked terms for safety checks
 BLOCKED_TERMS = [
@@ -76,16 +32,47 @@ BLOCKED_TERMS = [
     "weapon", "explicit", "offensive", "gambling", "suicide"
 ]
 
+# All blocked terms as one case-insensitive alternation, so the input is scanned once per request
+_BLOCKED_RE = re.compile(
+    r'\b(?:' + '|'.join(map(re.escape, BLOCKED_TERMS)) + r')\b', re.IGNORECASE
+)
+
+def _may_contain_blocked_term(text: str) -> bool:
+    """Cheap prefilter for safety_check: False only if no blocked term can match text.
+    
+    Plain substring tests over the lowercased text run about ten times faster than the
+    word-boundary regex, so benign requests skip the regex entirely. Non-ASCII text goes
+    straight to the regex, whose case-insensitive matching treats dotted and dotless
+    i as "i" where lower() does not.
+    """
+    if not text.isascii():
+        return True
+    # str.lower() has a dedicated ASCII path, so it is cheaper here than a bytes.translate
+    # round-trip; a plain loop avoids creating a generator for every short text part
+    lowered = text.lower()
+    for term in BLOCKED_TERMS:
+        if term in lowered:
+            return True
+    return False
+
+@functools.lru_cache(maxsize=1024)
+def _blocked_terms_in(text: str) -> tuple:
+    """Returns the distinct blocked terms in one text part, lowercased, in order of appearance.
+    
+    Every model request re-sends the whole conversation, so the parts of earlier turns are
+    checked again on each call; caching by text makes those repeats a single lookup.
+    """
+    if not _may_contain_blocked_term(text):
+        return ()
+    return tuple(dict.fromkeys(
+        match.group().lower() for match in _BLOCKED_RE.finditer(text)
+    ))
+
 # State management utilities
 def before_agent(callback_context: InvocationContext):
-    """Initialize the state with default user preferences if not already set."""
-    # Set default temperature unit if not already in state
-    if "temperature_unit" not in callback_context.state:
-        callback_context.state["temperature_unit"] = "celsius"
-    
-    # Initialize history of cities if not already in state
-    if "city_history" not in callback_context.state:
-        callback_context.state["city_history"] = []
+    """Initialize the state with default user preferences and safety metrics if not already set."""
+    # Set the default temperature unit and city history shared with the stateful agent
+    init_stateful_defaults(callback_context)
     
     # Initialize safety metrics if not already in state
     if "safety_metrics" not in callback_context.state:
@@ -94,19 +81,6 @@ def before_agent(callback_context: InvocationContext):
             "last_blocked_time": None,
             "blocked_terms_detected": []
         }
-    
-    # Log current state (for debugging)
-    print(f"Current state: {callback_context.state}")
-
-def rate_limit_callback(
-    callback_context: CallbackContext, llm_request: LlmRequest
-) -> None:
-    """Simple rate limiting implementation."""
-    # Ensure no empty text parts
-    for content in llm_request.contents:
-        for part in content.parts:
-            if part.text == "":
-                part.text = " "
 
 def safety_check(
     callback_context: CallbackContext, llm_request: LlmRequest
@@ -122,24 +96,21 @@ def safety_check(
         callback_context: The callback context containing state
         llm_request: The LLM request to check
     """
-    # Get current time for tracking
-    current_time = datetime.datetime.now().isoformat()
-    
-    # Get input text from request
-    input_texts = []
+    # Scan each text part for blocked terms as it is read, without joining them into one
+    # string, and fill empty text parts (the rate limit fix-up) in the same pass;
+    # function-call parts carry text=None and are left alone
+    detected = {}
     for content in llm_request.contents:
-        for part in content.parts:
-            if hasattr(part, 'text') and part.text:
-                input_texts.append(part.text.lower())
-    
-    # Join all input texts
-    combined_input = " ".join(input_texts)
+        for part in content.parts or ():
+            text = part.text
+            if text:
+                for term in _blocked_terms_in(text):
+                    detected[term] = None
+            elif text is not None:
+                part.text = " "
     
-    # Check for blocked terms
-    detected_terms = []
-    for term in BLOCKED_TERMS:
-        if re.search(r'\b' + re.escape(term) + r'\b', combined_input):
-            detected_terms.append(term)
+    # Each distinct blocked term once, in order of appearance
+    detected_terms = list(detected)
     
     # If blocked terms detected, modify the request
     if detected_terms:
@@ -153,14 +124,14 @@ def safety_check(
         
         metrics = callback_context.state["safety_metrics"]
         metrics["blocked_attempts"] += 1
-        metrics["last_blocked_time"] = current_time
+        # Read the clock only for blocked requests, the only ones that record a time
+        metrics["last_blocked_time"] = datetime.datetime.now().isoformat()
         metrics["blocked_terms_detected"].extend(detected_terms)
         
         # Clear the original contents
         llm_request.contents.clear()
         
         # Replace with safety message prompt
-        from google.genai.types import Part, Content
         safety_prompt = (
             "The user's query contained potentially harmful content that I cannot respond to. "
             "Please provide a polite response explaining that you cannot assist with "
@@ -176,200 +147,6 @@ def safety_check(
         llm_request.contents.append(new_content)
         
         print(f"Safety check blocked request. Detected terms: {detected_terms}")
-    else:
-        # Pass the rate limit check as well
-        rate_limit_callback(callback_context, llm_request)
-
-def update_city_history(city: str, tool_context: ToolContext) -> None:
-    """Helper function to update the city history in state.
-    
-    Args:
-        city (str): The city name to add to history.
-        tool_context (ToolContext): The tool context containing state.
-    """
-    # Ensure city_history exists
-    if "city_history" not in tool_context.state:
-        tool_context.state["city_history"] = []
-    
-    # Normalize city name
-    city_lower = city.lower().strip()
-    
-    # Add to history if not already the most recent
-    if not tool_context.state["city_history"] or tool_context.state["city_history"][-1] != city_lower:
-        tool_context.state["city_history"].append(city_lower)
-        # Keep only the most recent 5 cities
-        if len(tool_context.state["city_history"]) > 5:
-            tool_context.state["city_history"] = tool_context.state["city_history"][-5:]
-
-# Core Tool Implementations
-def validate_city_name(city: str, tool_context: ToolContext) -> dict:
-    """Validates and corrects city names, handling shorthands and misspellings.
-    
-    Args:
-        city (str): The user-provided city name that may contain errors.
-        tool_context (ToolContext): Context containing the state.
-        
-    Returns:
-        dict: Status and the corrected city name or error message.
-    """
-    if not city or not isinstance(city, str):
-        return {
-            "status": "error",
-            "error_message": "Please provide a valid city name."
-        }
-    
-    city_lower = city.lower().strip()
-    
-    # Check if the city is already valid
-    if city_lower in WEATHER_DATABASE or city_lower in TIMEZONE_DATABASE:
-        # Add valid city to history
-        update_city_history(city_lower, tool_context)
-                
-        return {
-            "status": "success",
-            "corrected_city": city_lower
-        }
-    
-    # Check if we have a correction for this city
-    if city_lower in CITY_CORRECTIONS:
-        corrected = CITY_CORRECTIONS[city_lower]
-        
-        # Add corrected city to history
-        update_city_history(corrected, tool_context)
-        
-        return {
-            "status": "success",
-            "corrected_city": corrected,
-            "original_city": city
-        }
-    
-    # No correction found
-    return {
-        "status": "error",
-        "error_message": f"I couldn't recognize '{city}'. Please provide a valid city name."
-    }
-
-def get_weather(city: str, tool_context: ToolContext) -> dict:
-    """Retrieves the current weather report for a specified city using user's preferred unit.
-
-    Args:
-        city (str): The name of the city for which to retrieve the weather report.
-        tool_context (ToolContext): Context containing the state with user preferences.
-
-    Returns:
-        dict: status and result or error msg.
-    """
-    city_key = city.lower()
-    
-    # Get the user's preferred temperature unit from state
-    temperature_unit = tool_context.state.get("temperature_unit", "celsius")
-    
-    # Always update the city history in state
-    update_city_history(city_key, tool_context)
-    
-    if city_key in WEATHER_DATABASE:
-        weather = WEATHER_DATABASE[city_key]
-        
-        # Format response based on user preference
-        if temperature_unit.lower() == "fahrenheit":
-            temperature_str = f"{weather['temperature_fahrenheit']} degrees Fahrenheit"
-        else:
-            temperature_str = f"{weather['temperature_celsius']} degrees Celsius"
-            
-        return {
-            "status": "success",
-            "report": f"The weather in {city} is {weather['condition']} with a temperature of {temperature_str}.",
-        }
-    else:
-        return {
-            "status": "error",
-            "error_message": f"Weather information for '{city}' is not available.",
-        }
-
-def get_current_time(city: str, tool_context: ToolContext) -> dict:
-    """Returns the current time in a specified city.
-
-    Args:
-        city (str): The name of the city for which to retrieve the current time.
-        tool_context (ToolContext): Context containing the state.
-
-    Returns:
-        dict: status and result or error msg.
-    """
-    city_key = city.lower()
-    
-    # Always update the city history
-    update_city_history(city_key, tool_context)
-    
-    if city_key in TIMEZONE_DATABASE:
-        tz_identifier = TIMEZONE_DATABASE[city_key]
-    else:
-        return {
-            "status": "error",
-            "error_message": (
-                f"Sorry, I don't have timezone information for {city}."
-            ),
-        }
-
-    tz = ZoneInfo(tz_identifier)
-    now = datetime.datetime.now(tz)
-    report = (
-        f'The current time in {city} is {now.strftime("%Y-%m-%d %H:%M:%S %Z%z")}'
-    )
-    return {"status": "success", "report": report}
-
-def update_temperature_preference(unit: str, tool_context: ToolContext) -> dict:
-    """Updates the user's temperature unit preference.
-    
-    Args:
-        unit (str): The temperature unit preference (celsius or fahrenheit).
-        tool_context (ToolContext): Context containing the state.
-        
-    Returns:
-        dict: Status and confirmation message.
-    """
-    unit = unit.lower().strip()
-    
-    # Validate the unit
-    if unit not in ["celsius", "fahrenheit"]:
-        return {
-            "status": "error",
-            "error_message": "Invalid temperature unit. Please choose 'celsius' or 'fahrenheit'."
-        }
-    
-    # Update the preference in state
-    tool_context.state["temperature_unit"] = unit
-    
-    return {
-        "status": "success",
-        "message": f"Your temperature unit preference has been updated to {unit}."
-    }
-
-def get_recent_cities(tool_context: ToolContext) -> dict:
-    """Retrieves the user's recently searched cities.
-    
-    Args:
-        tool_context (ToolContext): Context containing the state.
-        
-    Returns:
-        dict: Status and list of recently searched cities.
-    """
-    city_history = tool_context.state.get("city_history", [])
-    
-    if not city_history:
-        return {
-            "status": "success",
-            "message": "You haven't searched for any cities yet."
-        }
-    
-    # Format the city list
-    city_list = ", ".join(city_history)
-    
-    return {
-        "status": "success",
-        "message": f"Your recently searched cities: {city_list}",
-        "cities": city_history
-    }
 
 def get_safety_metrics(tool_context: ToolContext) -> dict:
     """Retrieves safety metrics from the agent's state.
@@ -403,35 +180,47 @@ def get_safety_metrics(tool_context: ToolContext) -> dict:
         "metrics": metrics
     }
 
-def combine_weather_time_info(city: Optional[str] = None, tool_context: Optional[ToolContext] = None) -> dict:
-    """Combines weather and time information into a single response.
+class FormatterAgent(BaseAgent):
+    """Answers with the weather and time for the validated city, without calling the model.
     
-    Args:
-        city (Optional[str], optional): The city name. Defaults to None.
-        tool_context (Optional[ToolContext], optional): Context containing the state.
-        
-    Returns:
-        dict: Combined weather and time information or error message.
+    Reads the city that validation stored in state, runs the weather and time tool directly,
+    and yields the formatted report as the final response. When validation found no city,
+    it yields nothing, so the validation agent's own reply ends the turn.
     """
-    if not city:
-        return {
-            "status": "error",
-            "error_message": "No city information was provided."
-        }
-    
-    # Format the output in a user-friendly way
-    unit_preference = "default"
-    if tool_context and "temperature_unit" in tool_context.state:
-        unit_preference = tool_context.state["temperature_unit"]
     
-    return {
-        "status": "success",
-        "message": f"Here's the information for {city} (temperature displayed in {unit_preference}):",
-        "city": city
-    }
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        city = ctx.session.state.get("corrected_city")
+        if not city:
+            return
+        # A tool context collects the tool's state changes (search history) for this event
+        tool_context = ToolContext(ctx)
+        city = city.title()
+        result = get_weather_and_time(city, tool_context)
+        if result["status"] == "error":
+            text = result["error_message"]
+        else:
+            header = combine_weather_time_info(city, tool_context)["message"]
+            text = f"{header}\n{result['weather']}\n{result['time']}"
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=Content(role="model", parts=[Part(text=text)]),
+            actions=tool_context.actions,
+        )
+
+# Define the model to use. A model name string makes ADK build a new Gemini wrapper, and with
+# it a new API client and connection pool, on every request of every agent; one shared
+# instance keeps a single client whose connections are reused across all agents.
+model = Gemini(model="gemini-2.0-flash-exp")  # or another Gemini model version
 
-# Define the model to use
-model = "gemini-2.0-flash-exp"  # or another Gemini model version
+def record_validated_city(
+    tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext, tool_response: dict
+) -> None:
+    """Keeps the city that validation settled on in state for the formatter that runs next."""
+    set_state_if_changed(tool_context.state, "corrected_city", tool_response.get("corrected_city", ""))
 
 # Create the validation agent with state awareness and safety checks
 validation_agent = Agent(
@@ -442,125 +231,169 @@ validation_agent = Agent(
         "You are an agent that validates city names, correcting spelling errors and "
         "expanding shorthand names to their full form. You also update the search history."
     ),
-    tools=[validate_city_name],
+    tools=[tool_def(validate_city_name)],
     before_agent_callback=before_agent,
     before_model_callback=safety_check,
+    after_tool_callback=record_validated_city,
 )
 
-# Create separate weather agent with state awareness and safety checks
-weather_agent = Agent(
-    name="weather_agent",
-    model=model,
-    description="Agent to answer questions about the weather in a city",
-    instruction=(
-        "You are a helpful agent who can provide weather information for a city. "
-        "You adapt your responses to show temperatures in the user's preferred unit. "
-        "You also track the cities that users search for in their history."
-    ),
-    tools=[get_weather],
-    before_agent_callback=before_agent,
-    before_model_callback=safety_check,
-)
-
-# Create separate time agent with state awareness and safety checks
-time_agent = Agent(
-    name="time_agent",
-    model=model,
-    description="Agent to answer questions about the current time in a city",
-    instruction=(
-        "You are a helpful agent who can provide current time information for a city. "
-        "You also track the cities that users search for in their history."
-    ),
-    tools=[get_current_time],
-    before_agent_callback=before_agent,
-    before_model_callback=safety_check,
-)
+def start_pipeline_turn(callback_context: CallbackContext):
+    """Initializes the state and clears the previous turn's validated city."""
+    before_agent(callback_context)
+    set_state_if_changed(callback_context.state, "corrected_city", "")
 
-# Create a combination agent with state awareness and safety checks
-combination_agent = Agent(
+# The combination step is a formatter rather than a model call: once the city is validated,
+# the answer is a fixed template over in-memory lookups
+combination_agent = FormatterAgent(
     name="combination_agent",
-    model=model,
-    description="Agent that combines weather and time information",
-    instruction=(
-        "You are a helpful agent who combines weather and time information for a city "
-        "into a comprehensive response, respecting the user's temperature unit preference."
-    ),
-    tools=[combine_weather_time_info],
-    before_agent_callback=before_agent,
-    before_model_callback=safety_check,
+    description="Formats the weather and time information for the validated city",
 )
 
-# Create a preferences agent to handle user preference updates with safety checks
+# Create a preferences agent to handle user preference updates with safety checks; it also
+# answers every turn the dispatcher can't route, so it carries the general assistant instruction
 preferences_agent = Agent(
     name="preferences_agent",
     model=model,
-    description="Agent that manages user preferences",
+    description="Agent that manages user preferences and answers general questions about the assistant",
     instruction=(
         "You are a helpful agent who manages user preferences, such as temperature units. "
-        "You can update preferences and provide information about current settings."
+        "You can update preferences and provide information about current settings, "
+        "recently searched cities and safety metrics."
+        "\n\n"
+        "You have built-in safety features that prevent responding to harmful, dangerous, "
+        "illegal, or unethical requests. If a user asks for something inappropriate, "
+        "you will politely explain that you cannot assist with such requests."
+        "\n\n"
+        "Current features you support: "
+        "- Weather information for supported cities "
+        "- Time information for supported cities "
+        "- Setting temperature unit preference (celsius/fahrenheit) "
+        "- Remembering recently searched cities "
+        "- Safety metrics tracking"
     ),
-    tools=[update_temperature_preference, get_recent_cities, get_safety_metrics],
+    tools=[tool_def(update_temperature_preference), tool_def(get_recent_cities), tool_def(get_safety_metrics)],
     before_agent_callback=before_agent,
     before_model_callback=safety_check,
 )
 
-# Create the parallel agent that gets weather and time information simultaneously
-# This agent will share state because each sub-agent inherits state from the parent
-parallel_weather_time_agent = ParallelAgent(
-    name="parallel_weather_time_agent",
-    description="Gets weather and time information in parallel while maintaining state",
-    sub_agents=[weather_agent, time_agent],
-)
-
 # Create the sequential agent pipeline:
 # 1. First validates the city name
-# 2. Then runs weather and time agents in parallel
-# 3. Finally combines the results
+# 2. Then looks up weather and time for the validated city and formats the answer, without a model call
 # All while maintaining shared state and with safety checks
 safe_root_agent = SequentialAgent(
     name="safe_stateful_parallel_weather_time_agent",
     description=(
         "Enhanced stateful agent with safety checks that validates city names before answering questions about "
-        "weather and time in parallel for the corrected city, then combines the results. "
+        "weather and time for the corrected city, then combines the results. "
         "The agent maintains state about user preferences and search history."
     ),
-    sub_agents=[validation_agent, parallel_weather_time_agent, combination_agent],
+    sub_agents=[validation_agent, combination_agent],
+    before_agent_callback=start_pipeline_turn,
+)
+
+# Single-purpose agents for questions about only the weather or only the time in a city
+weather_agent = Agent(
+    name="weather_agent",
+    model=model,
+    description="Agent to answer questions about the weather in a city",
+    instruction=(
+        "You are a helpful agent who can provide weather information for a city. "
+        "First validate the city name with validate_city_name, then look up the weather for the corrected city. "
+        "You adapt your responses to show temperatures in the user's preferred unit."
+    ),
+    tools=[tool_def(validate_city_name), tool_def(get_weather)],
     before_agent_callback=before_agent,
+    before_model_callback=safety_check,
 )
 
-# Create a standalone agent that can handle all operations including preferences
-# with safety checks throughout
-root_agent = Agent(
-    name="safe_weather_preferences_agent",
+time_agent = Agent(
+    name="time_agent",
     model=model,
-    description="A standalone agent that can handle all weather operations including preferences, with safety checks",
+    description="Agent to answer questions about the current time in a city",
     instruction=(
-        "You are a helpful weather assistant that remembers user preferences like temperature units. "
-        "You can provide weather and time information for cities, and you adapt your responses based on user preferences. "
-        "You can also update user preferences when requested and show search history."
-        "\n\n"
-        "You have built-in safety features that prevent responding to harmful, dangerous, "
-        "illegal, or unethical requests. If a user asks for something inappropriate, "
-        "you will politely explain that you cannot assist with such requests."
-        "\n\n"
-        "Current features you support: "
-        "- Weather information for supported cities "
-        "- Time information for supported cities "
-        "- Setting temperature unit preference (celsius/fahrenheit) "
-        "- Remembering recently searched cities "
-        "- Safety metrics tracking"
+        "You are a helpful agent who can provide the current time in a city. "
+        "First validate the city name with validate_city_name, then look up the time for the corrected city."
     ),
-    tools=[
-        validate_city_name,
-        get_weather,
-        get_current_time,
-        update_temperature_preference,
-        get_recent_cities,
-        get_safety_metrics,
-        combine_weather_time_info
-    ],
+    tools=[tool_def(validate_city_name), tool_def(get_current_time)],
     before_agent_callback=before_agent,
     before_model_callback=safety_check,
-    # Set output_key to save agent responses in state
-    output_key="last_response"
-)
\ No newline at end of file
+)
+
+# Words that make a turn a question about the weather
+_WEATHER_WORDS = r"weather|temperature|forecast|\b(?:rain\w*|snow\w*|sunny|cloud\w*)\b"
+
+# Intent rules for DispatcherAgent, tried in order. An explicit request to change the unit wins,
+# unless the turn also asks about the weather or time, or names a place after "in": then the unit
+# is only how to answer, and the weather and time agents read the preference themselves.
+_ROUTES = (
+    (re.compile(r"^(?!.*\b(?:weather|forecast|time)\b)(?!.*\bin\s+(?!celsius|fahrenheit)\w)"
+                r".*\b(?:prefer\w*|set|switch|change|use|like|want)\b.*\b(?:celsius|fahrenheit|units?)\b",
+                re.IGNORECASE | re.DOTALL),
+     "preferences_agent"),
+    (re.compile(rf"^(?=.*(?:{_WEATHER_WORDS}))(?=.*\btime\b)|\bboth\b", re.IGNORECASE | re.DOTALL),
+     "safe_stateful_parallel_weather_time_agent"),
+    (re.compile(_WEATHER_WORDS, re.IGNORECASE), "weather_agent"),
+    (re.compile(r"\btime\b|clock", re.IGNORECASE), "time_agent"),
+)
+
+def route(utterance: str) -> str:
+    """Returns the name of the sub-agent that should answer utterance.
+    
+    Anything no rule matches (greetings, questions about the assistant or the search history,
+    requests to refuse) goes to the preferences agent, which answers with safety checks.
+    """
+    for pattern, agent_name in _ROUTES:
+        if pattern.search(utterance):
+            return agent_name
+    return "preferences_agent"
+
+class DispatcherAgent(BaseAgent):
+    """Runs exactly one sub-agent per turn, chosen by rule-based intent matching.
+    
+    Routing costs no model call, and the chosen agent's model only sees its own few tool
+    schemas instead of every tool the application has.
+    """
+    
+    output_key: str = "last_response"
+    
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        utterance = ""
+        if ctx.user_content and ctx.user_content.parts:
+            utterance = " ".join(part.text for part in ctx.user_content.parts if part.text)
+        agent = self.find_sub_agent(route(utterance))
+        
+        state = ctx.session.state
+        query_key = " ".join(utterance.lower().split())
+        is_pipeline = agent is safe_root_agent
+        if is_pipeline and query_key == state.get("last_city_query") and state.get("corrected_city"):
+            # A repeat of the last city query: its city is already validated, so skip the
+            # validation model call and go straight to the formatter, which still looks up
+            # the current weather and time
+            agent = combination_agent
+        
+        async for event in agent.run_async(ctx):
+            # Keep the latest answer in state, as output_key does for an LLM agent, leaving it out
+            # of the state delta when it repeats the previous answer
+            if event.is_final_response() and event.content and event.content.parts:
+                response = "".join(part.text for part in event.content.parts if part.text)
+                if state.get(self.output_key) != response:
+                    event.actions.state_delta[self.output_key] = response
+                if not is_pipeline:
+                    # Another agent answered in between, so a later repeat of the last city query
+                    # may refer to a different city ("there") and has to be validated again
+                    if state.get("last_city_query"):
+                        event.actions.state_delta["last_city_query"] = ""
+                # Validation's events are already in the session, so its result can be read
+                elif state.get("corrected_city") and state.get("last_city_query") != query_key:
+                    event.actions.state_delta["last_city_query"] = query_key
+            yield event
+
+# Route each turn to the one specialist that can answer it, with safety checks throughout
+root_agent = DispatcherAgent(
+    name="safe_weather_preferences_agent",
+    description="A dispatcher that hands each weather, time or preferences request to one specialist agent, with safety checks",
+    sub_agents=[safe_root_agent, weather_agent, time_agent, preferences_agent],
+    before_agent_callback=before_agent,
+)
@@ -0,0 +1,316 @@
+import functools
+import logging
+from typing import Optional
+
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest
+from google.adk.tools import FunctionTool, ToolContext
+
+from city_data import (
+    CITY_INFO,
+    WEATHER_REPORT_SUFFIX_CELSIUS,
+    WEATHER_REPORT_SUFFIX_FAHRENHEIT,
+    canonical_city_name,
+    formatted_now,
+    validate_city,
+)
+
+logger = logging.getLogger(__name__)
+
+def _city_key(city: str) -> str:
+    """Returns the lookup key for a city name: surrounding whitespace removed, lowercased."""
+    return city.strip().lower()
+
+class _DeclaredFunctionTool(FunctionTool):
+    """A FunctionTool that builds its function declaration once per API variant.
+    
+    ADK asks every tool for its declaration on each model request, and FunctionTool
+    re-inspects the function's signature and docstring every time.
+    """
+    
+    def __init__(self, func):
+        super().__init__(func)
+        self._declarations = {}
+    
+    def _get_declaration(self):
+        variant = self._api_variant
+        declaration = self._declarations.get(variant)
+        if declaration is None:
+            declaration = self._declarations[variant] = super()._get_declaration()
+        return declaration
+
+@functools.lru_cache(maxsize=None)
+def tool_def(func) -> FunctionTool:
+    """Returns the one tool object wrapping func, shared by every agent that registers it."""
+    return _DeclaredFunctionTool(func)
+
+# State management utilities
+def set_state_if_changed(state, key: str, value) -> None:
+    """Writes value to state only when it differs, so unchanged keys stay out of the event's state delta."""
+    if state.get(key) != value:
+        state[key] = value
+
+def before_agent(callback_context: InvocationContext):
+    """Initialize the state with default user preferences if not already set."""
+    # Set default temperature unit if not already in state
+    if "temperature_unit" not in callback_context.state:
+        callback_context.state["temperature_unit"] = "celsius"
+    
+    # Initialize history of cities if not already in state
+    if "city_history" not in callback_context.state:
+        callback_context.state["city_history"] = []
+    
+    # Log current state (for debugging); the state is only stringified when debug logging is on
+    logger.debug("Current state: %s", callback_context.state)
+
+def rate_limit_callback(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> None:
+    """Simple rate limiting implementation."""
+    # Ensure no empty text parts
+    for content in llm_request.contents:
+        for part in content.parts or ():
+            # Truthiness settles the common non-empty case in one test; function-call
+            # parts carry text=None and must be left without text
+            if not part.text and part.text is not None:
+                part.text = " "
+
+def update_city_history(city: str, tool_context: ToolContext) -> None:
+    """Helper function to update the city history in state.
+    
+    Args:
+        city (str): The city name to add to history.
+        tool_context (ToolContext): The tool context containing state.
+    """
+    # Ensure city_history exists
+    city_history = tool_context.state.get("city_history") or []
+    
+    # Normalize city name
+    city_lower = _city_key(city)
+    
+    # Add to history if not already the most recent, keeping only the last 5; the new
+    # list is built in one step and stays a plain list, since session state must be JSON-serializable
+    if not city_history or city_history[-1] != city_lower:
+        tool_context.state["city_history"] = [*city_history[-4:], city_lower]
+
+# Fixed tool responses, built once and returned as-is; ADK copies a tool's result into the
+# function response it sends, so sharing one dict between calls is safe
+_ERR_NO_CITY = {
+    "status": "error",
+    "error_message": "Please provide a valid city name."
+}
+_ERR_INVALID_UNIT = {
+    "status": "error",
+    "error_message": "Invalid temperature unit. Please choose 'celsius' or 'fahrenheit'."
+}
+_NO_RECENT_CITIES = {
+    "status": "success",
+    "message": "You haven't searched for any cities yet."
+}
+_ERR_NO_CITY_INFO = {
+    "status": "error",
+    "error_message": "No city information was provided."
+}
+
+# Core Tool Implementations
+def validate_city_name(city: str, tool_context: ToolContext) -> dict:
+    """Validates and corrects city names, handling shorthands and misspellings.
+    
+    Args:
+        city (str): The user-provided city name that may contain errors.
+        tool_context (ToolContext): Context containing the state.
+        
+    Returns:
+        dict: Status and the corrected city name or error message.
+    """
+    if not city or not isinstance(city, str):
+        return _ERR_NO_CITY
+    
+    city_lower = _city_key(city)
+    
+    # Resolved through the validator c, d and e share, whose cache spans every session: a typo
+    # pays for the fuzzy match once, and every later occurrence is a single lookup
+    corrected = validate_city(city).get("corrected_city")
+    
+    # No correction found
+    if corrected is None:
+        return {
+            "status": "error",
+            "error_message": f"I couldn't recognize '{city}'. Please provide a valid city name."
+        }
+    
+    # Add the valid city to history
+    update_city_history(corrected, tool_context)
+    
+    result = {
+        "status": "success",
+        "corrected_city": corrected
+    }
+    # Report the original spelling when a shorthand or misspelling was corrected
+    if corrected != city_lower:
+        result["original_city"] = city
+    return result
+
+def get_weather(city: str, tool_context: ToolContext) -> dict:
+    """Retrieves the current weather report for a specified city using user's preferred unit.
+
+    Args:
+        city (str): The name of the city for which to retrieve the weather report.
+        tool_context (ToolContext): Context containing the state with user preferences.
+
+    Returns:
+        dict: status and result or error msg.
+    """
+    city_key = _city_key(city)
+    
+    # Get the user's preferred temperature unit from state
+    temperature_unit = tool_context.state.get("temperature_unit", "celsius")
+    
+    # Always update the city history in state
+    update_city_history(city_key, tool_context)
+    
+    # Pick the pre-formatted report based on user preference
+    if temperature_unit.lower() == "fahrenheit":
+        report_suffixes = WEATHER_REPORT_SUFFIX_FAHRENHEIT
+    else:
+        report_suffixes = WEATHER_REPORT_SUFFIX_CELSIUS
+    # One probe covers canonical names, shorthands, misspellings and spellings like "N.Y.C."
+    report_suffix = report_suffixes.get(canonical_city_name(city))
+    
+    if report_suffix:
+        return {
+            "status": "success",
+            "report": f"The weather in {city} {report_suffix}",
+        }
+    else:
+        return {
+            "status": "error",
+            "error_message": f"Weather information for '{city}' is not available.",
+        }
+
+def get_current_time(city: str, tool_context: ToolContext) -> dict:
+    """Returns the current time in a specified city.
+
+    Args:
+        city (str): The name of the city for which to retrieve the current time.
+        tool_context (ToolContext): Context containing the state.
+
+    Returns:
+        dict: status and result or error msg.
+    """
+    city_key = _city_key(city)
+    
+    # Always update the city history
+    update_city_history(city_key, tool_context)
+    
+    entry = CITY_INFO.get(canonical_city_name(city))
+    if entry and entry["tz"]:
+        tz = entry["tz"]
+    else:
+        return {
+            "status": "error",
+            "error_message": (
+                f"Sorry, I don't have timezone information for {city}."
+            ),
+        }
+
+    report = f"The current time in {city} is {formatted_now(tz)}"
+    return {"status": "success", "report": report}
+
+def get_weather_and_time(city: str, tool_context: ToolContext) -> dict:
+    """Retrieves the current weather report and local time for a specified city in one call.
+
+    Args:
+        city (str): The name of the city for which to retrieve the weather and time.
+        tool_context (ToolContext): Context containing the state with user preferences.
+
+    Returns:
+        dict: status and both reports, or error msg.
+    """
+    weather = get_weather(city, tool_context)
+    current_time = get_current_time(city, tool_context)
+    if weather["status"] == "error" and current_time["status"] == "error":
+        return {
+            "status": "error",
+            "error_message": f"Weather and time information for '{city}' is not available.",
+        }
+
+    # A city may have a timezone but no weather data, so report each part separately
+    return {
+        "status": "success",
+        "weather": weather.get("report") or weather["error_message"],
+        "time": current_time.get("report") or current_time["error_message"],
+    }
+
+def update_temperature_preference(unit: str, tool_context: ToolContext) -> dict:
+    """Updates the user's temperature unit preference.
+    
+    Args:
+        unit (str): The temperature unit preference (celsius or fahrenheit).
+        tool_context (ToolContext): Context containing the state.
+        
+    Returns:
+        dict: Status and confirmation message.
+    """
+    unit = unit.lower().strip()
+    
+    # Validate the unit
+    if unit not in ["celsius", "fahrenheit"]:
+        return _ERR_INVALID_UNIT
+    
+    # Update the preference in state; re-selecting the current unit leaves the state delta empty
+    set_state_if_changed(tool_context.state, "temperature_unit", unit)
+    
+    return {
+        "status": "success",
+        "message": f"Your temperature unit preference has been updated to {unit}."
+    }
+
+def get_recent_cities(tool_context: ToolContext) -> dict:
+    """Retrieves the user's recently searched cities.
+    
+    Args:
+        tool_context (ToolContext): Context containing the state.
+        
+    Returns:
+        dict: Status and list of recently searched cities.
+    """
+    city_history = tool_context.state.get("city_history", [])
+    
+    if not city_history:
+        return _NO_RECENT_CITIES
+    
+    # Format the city list
+    city_list = ", ".join(city_history)
+    
+    return {
+        "status": "success",
+        "message": f"Your recently searched cities: {city_list}",
+        # An immutable snapshot, so the response never aliases the history held in state
+        "cities": tuple(city_history)
+    }
+
+def combine_weather_time_info(city: Optional[str] = None, tool_context: Optional[ToolContext] = None) -> dict:
+    """Combines weather and time information into a single response.
+    
+    Args:
+        city (Optional[str], optional): The city name. Defaults to None.
+        tool_context (Optional[ToolContext], optional): Context containing the state.
+        
+    Returns:
+        dict: Combined weather and time information or error message.
+    """
+    if not city:
+        return _ERR_NO_CITY_INFO
+    
+    # Format the output in a user-friendly way
+    unit_preference = "default"
+    if tool_context and "temperature_unit" in tool_context.state:
+        unit_preference = tool_context.state["temperature_unit"]
+    
+    return {
+        "status": "success",
+        "message": f"Here's the information for {city} (temperature displayed in {unit_preference}):",
+        "city": city
+    }